@@ -14,6 +14,8 @@
 # limitations under the License.
 # ==============================================================================
 """ module """
+import importlib
+
 # data
 from .data import SpeechRecognitionDatasetBuilder
 from .data import SpeechDatasetBuilder
@@ -28,6 +30,7 @@ from .layers.functional import gelu
 from .layers.commons import PositionalEncoding
 from .layers.commons import Collapse4D
 from .layers.commons import TdnnLayer
+from .layers.commons import CmvnLayer
 from .layers.commons import Gelu
 from .layers.attention import MultiHeadAttention
 from .layers.attention import BahdanauAttention
@@ -39,13 +42,16 @@ from .layers.transformer import TransformerDecoder
 from .layers.transformer import TransformerEncoderLayer
 from .layers.transformer import TransformerDecoderLayer
 
-# models
-from .models.base import BaseModel
-from .models.speech_transformer import SpeechTransformer, SpeechTransformer2
-from .models.masked_pc import MaskedPredictCoding
-from .models.deep_speech import DeepSpeechModel
-from .models.mtl_seq2seq import MtlTransformerCtc
-from .models.rnn_lm import RNNLM
+# models, imported on first access as a run only uses one of them
+_LAZY_MODELS = {
+    "BaseModel": ".models.base",
+    "SpeechTransformer": ".models.speech_transformer",
+    "SpeechTransformer2": ".models.speech_transformer",
+    "MaskedPredictCoding": ".models.masked_pc",
+    "DeepSpeechModel": ".models.deep_speech",
+    "MtlTransformerCtc": ".models.mtl_seq2seq",
+    "RNNLM": ".models.rnn_lm",
+}
 
 # solver & loss & accuracy
 from .solver import BaseSolver
@@ -70,3 +76,11 @@ from .utils.misc import set_default_summary_writer
 
 # tools
 from .tools.beam_search import BeamSearchDecoder
+
+
+def __getattr__(name):
+    """ lazily import the models listed in _LAZY_MODELS """
+    if name in _LAZY_MODELS:
+        module = importlib.import_module(_LAZY_MODELS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -21,10 +21,25 @@ import random
 from absl import logging
 import tensorflow as tf
 
-from ...utils.data_queue import DataQueue
 
-def data_loader(dataset_builder, batch_size=16, num_threads=1):
+def _apply_pipeline_options(dataset, deterministic=True):
+    """ enable the static tf.data graph optimizations for the input pipeline """
+    options = tf.data.Options()
+    options.experimental_deterministic = deterministic
+    options.experimental_optimization.autotune = True
+    options.experimental_optimization.map_and_batch_fusion = True
+    options.experimental_optimization.map_parallelization = True
+    return dataset.with_options(options)
+
+
+def data_loader(dataset_builder, batch_size=16, num_threads=1, deterministic=True):
     """ dataloader
+
+    num_threads is the number of samples prepared in parallel, use
+    tf.data.experimental.AUTOTUNE (-1) to let tf.data tune it at runtime.
+    If deterministic is False, the parallel map may return a sample that is
+    ready before the preceding ones, which is faster for utterances of
+    different lengths but only keeps the order approximately.
     """
     num_samples = len(dataset_builder)
     if num_samples == 0:
@@ -32,29 +47,40 @@ def data_loader(dataset_builder, batch_size=16, num_threads=1):
 
     if num_threads == 1:
         def _gen_data():
-            """ multi thread loader """
+            """ single thread loader """
             for i in range(num_samples):
                 yield dataset_builder[i]
+
+        # make dataset using from_generator
+        dataset = tf.compat.v2.data.Dataset.from_generator(
+            _gen_data,
+            output_types=dataset_builder.sample_type,
+            output_shapes=dataset_builder.sample_shape,
+        )
     else:
-        # multi-thread
+        # multi-thread, samples are prepared by a parallel map over their indices
         logging.info("loading data using %d threads" % num_threads)
-        data_queue = DataQueue(
-            lambda i: dataset_builder[i],
-            capacity=4096,
-            num_threads=num_threads,
-            max_index=num_samples
+        sample_type = dataset_builder.sample_type
+        sample_shape = dataset_builder.sample_shape
+        keys = list(sample_type.keys())
+
+        def _load_sample(index):
+            """ load one sample as a list of tensors """
+            sample = dataset_builder[int(index.numpy())]
+            return [sample[key] for key in keys]
+
+        def _map_sample(index):
+            """ wrap _load_sample to build the sample dict """
+            values = tf.py_function(
+                _load_sample, [index], [sample_type[key] for key in keys]
+            )
+            for key, value in zip(keys, values):
+                value.set_shape(sample_shape[key])
+            return dict(zip(keys, values))
+
+        dataset = tf.data.Dataset.range(num_samples).map(
+            _map_sample, num_parallel_calls=num_threads
         )
-        def _gen_data():
-            """ multi thread loader """
-            for _ in range(num_samples):
-                yield data_queue.get()
-
-    # make dataset using from_generator
-    dataset = tf.compat.v2.data.Dataset.from_generator(
-        _gen_data,
-        output_types=dataset_builder.sample_type,
-        output_shapes=dataset_builder.sample_shape,
-    )
 
     # Padding the features to its max length dimensions.
     dataset = dataset.padded_batch(
@@ -63,9 +89,10 @@ def data_loader(dataset_builder, batch_size=16, num_threads=1):
         drop_remainder=True,
     )
 
-    # Prefetch to improve speed of input pipeline.
-    dataset = dataset.prefetch(buffer_size=500)
-    return dataset
+    # Prefetch to improve speed of input pipeline, overlapping the preparation
+    # of the next batch with the current training step.
+    dataset = dataset.prefetch(buffer_size=tf.data.experimental.AUTOTUNE)
+    return _apply_pipeline_options(dataset, deterministic)
 
 
 class BaseDatasetBuilder:
@@ -101,9 +128,16 @@ class BaseDatasetBuilder:
         """ examples signature """
         raise NotImplementedError
 
-    def as_dataset(self, batch_size=16, num_threads=1):
+    @property
+    def cmvn_layer(self):
+        """ the layer to apply cmvn on the device, None if it is applied in
+        the data pipeline
+        """
+        return None
+
+    def as_dataset(self, batch_size=16, num_threads=1, deterministic=True):
         """ return tf.data.Dataset object """
-        return data_loader(self, batch_size, num_threads)
+        return data_loader(self, batch_size, num_threads, deterministic)
 
     def shard(self, num_shards, index):
         """ Creates a Dataset that includes only 1/num_shards of this dataset """
@@ -36,6 +36,10 @@ class SpeechRecognitionDatasetBuilder(BaseDatasetBuilder):
     Config::
         audio_config: the config file for feature extractor, default={'type':'Fbank'}
         vocab_file: the vocab file, default='data/utils/ch-en.vocab'
+        cmvn_on_device: apply cmvn in the model step on the device instead of in the
+            data pipeline, only global cmvn is supported; the raw features are
+            transferred in float32 (cmvn_dtype must not be set), so this saves
+            no transfer bandwidth, default=False
 
     Interfaces::
         __len__(self): return the number of data samples
@@ -56,6 +60,7 @@ class SpeechRecognitionDatasetBuilder(BaseDatasetBuilder):
         "input_length_range": [20, 50000],
         "output_length_range": [1, 10000],
         "speed_permutation": [1.0],
+        "cmvn_on_device": False,
     }
 
     def __init__(self, config=None):
@@ -66,6 +71,9 @@ class SpeechRecognitionDatasetBuilder(BaseDatasetBuilder):
         logging.info("hparams: {}".format(self.hparams))
 
         self.audio_featurizer = AudioFeaturizer(self.hparams.audio_config)
+        if self.hparams.cmvn_on_device and self.audio_featurizer.dtype != tf.float32:
+            # the unnormalized features lose too much precision in a narrower dtype
+            raise ValueError("cmvn_dtype can not be used with cmvn_on_device")
         self.feature_normalizer = FeatureNormalizer(self.hparams.cmvn_file)
         self.text_featurizer = TextFeaturizer(self.hparams.text_config)
 
@@ -130,7 +138,10 @@ class SpeechRecognitionDatasetBuilder(BaseDatasetBuilder):
     def __getitem__(self, index):
         audio_data, _, transcripts, speed, speaker = self.entries[index]
         feat = self.audio_featurizer(audio_data, speed=speed)
-        feat = self.feature_normalizer(feat, speaker)
+        if not self.hparams.cmvn_on_device:
+            feat = self.feature_normalizer(feat, speaker)
+        # only narrow the dtype (see cmvn_dtype) after the mean is subtracted
+        feat = tf.cast(feat, self.audio_featurizer.dtype)
         feat_length = feat.shape[0]
 
         label = self.text_featurizer.encode(transcripts)
@@ -164,7 +175,7 @@ class SpeechRecognitionDatasetBuilder(BaseDatasetBuilder):
     @property
     def sample_type(self):
         return {
-            "input": tf.float32,
+            "input": self.audio_featurizer.dtype,
             "input_length": tf.int32,
             "output_length": tf.int32,
             "output": tf.int32,
@@ -181,6 +192,13 @@ class SpeechRecognitionDatasetBuilder(BaseDatasetBuilder):
             "output": tf.TensorShape([None]),
         }
 
+    @property
+    def cmvn_layer(self):
+        """ the layer to apply cmvn on the device if cmvn_on_device is set """
+        if not self.hparams.cmvn_on_device:
+            return None
+        return self.feature_normalizer.as_layer()
+
     @property
     def sample_signature(self):
         dim = self.audio_featurizer.dim
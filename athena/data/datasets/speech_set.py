@@ -107,6 +107,8 @@ class SpeechDatasetBuilder(BaseDatasetBuilder):
         audio_file, _, speaker = self.entries[index]
         feat = self.audio_featurizer(audio_file)
         feat = self.feature_normalizer(feat, speaker)
+        # only narrow the dtype (see cmvn_dtype) after the mean is subtracted
+        feat = tf.cast(feat, self.audio_featurizer.dtype)
         input_data = feat
         output_data = tf.reshape(
             feat, [-1, self.audio_featurizer.dim * self.audio_featurizer.num_channels]
@@ -142,9 +144,9 @@ class SpeechDatasetBuilder(BaseDatasetBuilder):
     @property
     def sample_type(self):
         return {
-            "input": tf.float32,
+            "input": self.audio_featurizer.dtype,
             "input_length": tf.int32,
-            "output": tf.float32,
+            "output": self.audio_featurizer.dtype,
             "output_length": tf.int32,
         }
 
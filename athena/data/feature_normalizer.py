@@ -23,6 +23,7 @@ import time
 import pandas
 from absl import logging
 import tensorflow as tf
+from ..layers.commons import CmvnLayer
 
 
 class FeatureNormalizer:
@@ -48,33 +49,55 @@ class FeatureNormalizer:
         shape = feat_data.get_shape().as_list()[1:]
         mean = tf.reshape(tf.convert_to_tensor(mean, dtype=tf.float32), shape)
         var = tf.reshape(tf.convert_to_tensor(var, dtype=tf.float32), shape)
-        feat_data = (feat_data - mean) / tf.sqrt(var)
-        return feat_data
+        # normalize in float32 and keep the dtype of the feature
+        dtype = feat_data.dtype
+        feat_data = (tf.cast(feat_data, tf.float32) - mean) / tf.sqrt(var)
+        return tf.cast(feat_data, dtype)
+
+    def as_layer(self):
+        """ return a CmvnLayer with the global statistics, to apply cmvn on the
+        device instead of in the data pipeline
+        """
+        if list(self.cmvn_dict.keys()) != ["global"]:
+            raise ValueError(
+                "cmvn on device only supports the global speaker, got {}".format(
+                    list(self.cmvn_dict.keys())
+                )
+            )
+        mean, var = self.cmvn_dict["global"]
+        return CmvnLayer(mean, var)
 
     def compute_cmvn(self, entries, speakers, featurizer, feature_dim):
         """ Compute cmvn for filtered entries """
         start = time.time()
+
+        def _compute_statistics(audio_file):
+            """ the frame number, sum and square sum of one utterance """
+            feat_data = tf.cast(featurizer(audio_file), tf.float32)
+            temp_feat = tf.reshape(feat_data, [-1, feature_dim])
+            return (
+                tf.shape(temp_feat)[0],
+                tf.reduce_sum(temp_feat, axis=[0]),
+                tf.reduce_sum(tf.square(temp_feat), axis=[0]),
+            )
+
         for tar_speaker in speakers:
             logging.info("processing %s" % tar_speaker)
+            audio_files = [items[0] for items in entries if items[-1] == tar_speaker]
+            if not audio_files:
+                continue
             initial_mean = tf.Variable(tf.zeros([feature_dim], dtype=tf.float32))
             initial_var = tf.Variable(tf.zeros([feature_dim], dtype=tf.float32))
             total_num = tf.Variable(0, dtype=tf.int32)
 
-            tq_entries = tqdm.tqdm(entries)
-            for items in tq_entries:
-                audio_file, speaker = items[0], items[-1]
-                if speaker != tar_speaker:
-                    continue
-                feat_data = featurizer(audio_file)
-                temp_frame_num = feat_data.shape[0]
+            # extract the features of different utterances in parallel
+            dataset = tf.data.Dataset.from_tensor_slices(audio_files).map(
+                _compute_statistics,
+                num_parallel_calls=tf.data.experimental.AUTOTUNE
+            )
+            for temp_frame_num, temp_mean, temp_var in tqdm.tqdm(
+                    dataset, total=len(audio_files)):
                 total_num.assign_add(temp_frame_num)
-
-                temp_feat = tf.reshape(feat_data, [-1, feature_dim])
-                temp_feat2 = tf.square(temp_feat)
-
-                temp_mean = tf.reduce_sum(temp_feat, axis=[0])
-                temp_var = tf.reduce_sum(temp_feat2, axis=[0])
-
                 initial_mean.assign_add(temp_mean)
                 initial_var.assign_add(temp_var)
 
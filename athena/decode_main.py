@@ -24,16 +24,18 @@ from absl import logging
 from athena import DecoderSolver
 from athena.main import (
     parse_config,
-    build_model_from_jsonfile
+    build_model_from_config
 )
 
 
-def decode(jsonfile):
+def decode(config):
     """ entry point for model decoding, do some preparation work """
-    p, model, _, checkpointer, dataset_builder = build_model_from_jsonfile(jsonfile, 0)
+    p, model, _, checkpointer, dataset_builder = build_model_from_config(config, 0)
     checkpointer.restore_from_best()
-    solver = DecoderSolver(model, config=p.decode_config)
     dataset_builder = dataset_builder.load_csv(p.test_csv).compute_cmvn_if_necessary(True)
+    solver = DecoderSolver(
+        model, config=p.decode_config, cmvn_layer=dataset_builder.cmvn_layer
+    )
     solver.decode(dataset_builder.as_dataset(batch_size=1))
 
 
@@ -47,4 +49,4 @@ if __name__ == "__main__":
         CONFIG = json.load(f)
     PARAMS = parse_config(CONFIG)
     DecoderSolver.initialize_devices(PARAMS.solver_gpu)
-    decode(JSON_FILE)
+    decode(CONFIG)
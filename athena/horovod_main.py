@@ -35,4 +35,4 @@ if __name__ == "__main__":
         CONFIG = json.load(f)
     PARAMS = parse_config(CONFIG)
     HorovodSolver.initialize_devices()
-    train(JSON_FILE, HorovodSolver, hvd.size(), hvd.local_rank())
+    train(CONFIG, HorovodSolver, hvd.size(), hvd.local_rank())
@@ -18,6 +18,7 @@
 # pylint: disable=no-self-use, missing-function-docstring
 """Utils for common layers."""
 
+import numpy as np
 import tensorflow as tf
 from athena.layers.functional import make_positional_encoding, collapse4d, gelu
 
@@ -65,6 +66,47 @@ class Gelu(tf.keras.layers.Layer):
         return gelu(x)
 
 
+class CmvnLayer(tf.keras.layers.Layer):
+    """ apply cmvn to padded features [N T D C] on the device
+    Args:
+        mean: a list of D*C mean values
+        variance: a list of D*C variance values
+    """
+
+    def __init__(self, mean, variance, **kwargs):
+        super().__init__(**kwargs)
+        self.mean_value = np.asarray(mean, dtype=np.float32)
+        self.inv_std_value = 1.0 / np.sqrt(np.asarray(variance, dtype=np.float32))
+        self.mean = None
+        self.inv_std = None
+
+    def build(self, input_shape):
+        shape = tf.TensorShape(input_shape)[2:]
+        self.mean = self.add_weight(
+            name="mean",
+            shape=shape,
+            initializer=tf.constant_initializer(self.mean_value.reshape(shape)),
+            trainable=False,
+        )
+        self.inv_std = self.add_weight(
+            name="inv_std",
+            shape=shape,
+            initializer=tf.constant_initializer(self.inv_std_value.reshape(shape)),
+            trainable=False,
+        )
+        super().build(input_shape)
+
+    def call(self, x, length):
+        """ normalize x and keep the padded frames zero
+        Args:
+            x: the padded features [N T D C]
+            length: the number of valid frames [N]
+        """
+        x = (tf.cast(x, tf.float32) - self.mean) * self.inv_std
+        mask = tf.sequence_mask(length, tf.shape(x)[1], dtype=x.dtype)
+        return x * mask[:, :, tf.newaxis, tf.newaxis]
+
+
 class TdnnLayer(tf.keras.layers.Layer):
     """ An implement of Tdnn Layer
     Args:
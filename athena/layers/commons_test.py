@@ -0,0 +1,50 @@
+# Copyright (C) 2017 Beijing Didi Infinity Technology and Development Co.,Ltd.
+# All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import numpy as np
+import tensorflow as tf
+from athena.data.feature_normalizer import FeatureNormalizer
+
+
+class CmvnLayerTest(tf.test.TestCase):
+    def test_cmvn_layer(self):
+        dim, num_channels = 40, 1
+        mean = np.random.uniform(size=dim * num_channels).astype(np.float32)
+        variance = np.random.uniform(0.5, 1.5, size=dim * num_channels).astype(np.float32)
+        normalizer = FeatureNormalizer()
+        normalizer.cmvn_dict["global"] = (mean.tolist(), variance.tolist())
+        cmvn_layer = normalizer.as_layer()
+
+        length = [50, 30]
+        feats = [
+            tf.random.uniform([frames, dim, num_channels], maxval=10.0) for frames in length
+        ]
+        padded = tf.stack(
+            [tf.pad(feat, [[0, max(length) - feat.shape[0]], [0, 0], [0, 0]]) for feat in feats]
+        )
+        normalized = cmvn_layer(padded, tf.constant(length))
+        for i, feat in enumerate(feats):
+            expected = normalizer.apply_cmvn(feat, "global")
+            self.assertAllClose(expected, normalized[i, : length[i]], rtol=1e-5, atol=1e-5)
+            # the padded frames stay zero
+            self.assertAllEqual(
+                tf.zeros_like(normalized[i, length[i]:]), normalized[i, length[i]:]
+            )
+
+
+if __name__ == "__main__":
+    if tf.__version__ < "2.0.0":
+        tf.compat.v1.enable_eager_execution()
+    tf.test.main()
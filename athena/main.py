@@ -17,8 +17,11 @@
 # Only support tensorflow 2.0
 # pylint: disable=invalid-name, no-member, wildcard-import, unused-wildcard-import
 """ a sample implementation of LAS for HKUST """
+import os
 import sys
 import json
+import hashlib
+import importlib
 import tensorflow as tf
 from absl import logging
 from athena import *
@@ -29,13 +32,14 @@ SUPPORTED_DATASET_BUILDER = {
     "language_dataset": LanguageDatasetBuilder,
 }
 
+# models are given as "module:class" and only imported when used
 SUPPORTED_MODEL = {
-    "deep_speech": DeepSpeechModel,
-    "speech_transformer": SpeechTransformer,
-    "speech_transformer2": SpeechTransformer2,
-    "mtl_transformer_ctc": MtlTransformerCtc,
-    "mpc": MaskedPredictCoding,
-    "rnnlm": RNNLM
+    "deep_speech": "athena.models.deep_speech:DeepSpeechModel",
+    "speech_transformer": "athena.models.speech_transformer:SpeechTransformer",
+    "speech_transformer2": "athena.models.speech_transformer:SpeechTransformer2",
+    "mtl_transformer_ctc": "athena.models.mtl_seq2seq:MtlTransformerCtc",
+    "mpc": "athena.models.masked_pc:MaskedPredictCoding",
+    "rnnlm": "athena.models.rnn_lm:RNNLM"
 }
 
 SUPPORTED_OPTIMIZER = {
@@ -61,30 +65,65 @@ DEFAULT_CONFIGS = {
     "dataset_builder": "speech_recognition_dataset",
     "dataset_config": None,
     "num_data_threads": 1,
+    # keep the training batches extracted in the first epoch in memory
+    "cache_dataset": False,
+    # write the training batches to disk instead, named after a hash of the
+    # configuration they depend on so that a changed config gets a new snapshot;
+    # changed files under the same paths are not detected, and old snapshots
+    # are never removed, so delete the directory by hand in these cases; the
+    # snapshot keeps the batch order of the first shuffled epoch, later epochs
+    # and runs reshuffle it within shuffle_buffer_size batches only
+    "snapshot_dir": None,
+    # number of batches read back from snapshot_dir that the shuffle of later
+    # epochs keeps in memory, the in-memory cache is always shuffled as a whole
+    "shuffle_buffer_size": 64,
+    "enable_xla": False,
     "train_csv": None,
     "dev_csv": None,
     "test_csv": None,
     "decode_config": None,
 }
 
+def _model_class(name):
+    """ return the model class registered as name, importing its module """
+    module_name, class_name = SUPPORTED_MODEL[name].split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+def _snapshot_file(p, rank_size, rank):
+    """ return the cache file of this rank in snapshot_dir, removing what a killed
+    run left behind while writing it
+    """
+    key = json.dumps(
+        [p.train_csv, p.dataset_builder, p.dataset_config, p.batch_size, rank_size],
+        sort_keys=True
+    )
+    cache_file = os.path.join(
+        p.snapshot_dir,
+        "train_%s_%d_of_%d" % (hashlib.md5(key.encode()).hexdigest(), rank, rank_size)
+    )
+    lock_file = cache_file + ".lockfile"
+    if tf.io.gfile.exists(lock_file) and not tf.io.gfile.exists(cache_file + ".index"):
+        logging.warning("removing the incomplete snapshot %s" % cache_file)
+        for filename in tf.io.gfile.glob(cache_file + "_*"):
+            tf.io.gfile.remove(filename)
+        tf.io.gfile.remove(lock_file)
+    return cache_file
+
 def parse_config(config):
     """ parse config """
     p = register_and_parse_hparams(DEFAULT_CONFIGS, config, cls="main")
     logging.info("hparams: {}".format(p))
     return p
 
-def build_model_from_jsonfile(jsonfile, rank=0, pre_run=True):
-    """ creates model using configurations in json, load from checkpoint
+def build_model_from_config(config, rank=0, pre_run=True):
+    """ creates model using configurations parsed from json, load from checkpoint
     if previous models exist in checkpoint dir
     """
-    config = None
-    with open(jsonfile) as file:
-        config = json.load(file)
     p = parse_config(config)
     dataset_builder = SUPPORTED_DATASET_BUILDER[p.dataset_builder](p.dataset_config)
 
     # models
-    model = SUPPORTED_MODEL[p.model](
+    model = _model_class(p.model)(
         num_classes=p.num_classes
         if p.num_classes is not None
         else dataset_builder.num_class,
@@ -107,26 +146,31 @@ def build_model_from_jsonfile(jsonfile, rank=0, pre_run=True):
         if p.dev_csv is None:
             raise ValueError("we currently need a dev_csv for pre-load")
         dataset = dataset_builder.load_csv(p.dev_csv).as_dataset(p.batch_size)
-        solver.evaluate_step(model.prepare_samples(iter(dataset).next()))
+        solver.evaluate_step(solver.prepare_samples(iter(dataset).next()))
     if rank == 0:
         set_default_summary_writer(p.summary_dir)
     return p, model, optimizer, checkpointer, dataset_builder
 
 
-def train(jsonfile, Solver, rank_size=1, rank=0):
+def train(config, Solver, rank_size=1, rank=0):
     """ entry point for model training, implements train loop
 
-	:param jsonfile: json file to read configuration from
+	:param config: configuration dict loaded from the json file
 	:param Solver: an abstract class that implements high-level logic of train, evaluate, decode, etc
 	:param rank_size: total number of workers, 1 if using single gpu
 	:param rank: rank of current worker, 0 if using single gpu
 	"""
     p, model, optimizer, checkpointer, dataset_builder \
-        = build_model_from_jsonfile(jsonfile, rank)
+        = build_model_from_config(config, rank)
+    if p.enable_xla:
+        # let XLA cluster and fuse the ops of the tf.function train/evaluate steps
+        tf.config.optimizer.set_jit(True)
     epoch = checkpointer.save_counter
     if p.pretrained_model is not None and epoch == 0:
+        with open(p.pretrained_model) as file:
+            pretrained_config = json.load(file)
         p2, pretrained_model, _, _, _ \
-            = build_model_from_jsonfile(p.pretrained_model, rank)
+            = build_model_from_config(pretrained_config, rank)
         model.restore_from_pretrained_model(pretrained_model, p2.model)
 
     # for cmvn
@@ -138,20 +182,63 @@ def train(jsonfile, Solver, rank_size=1, rank=0):
         optimizer,
         sample_signature=dataset_builder.sample_signature,
         config=p.solver_config,
+        cmvn_layer=dataset_builder.cmvn_layer,
+    )
+    # the dataset reads the entries of dataset_builder at every iteration, so it
+    # is built only once and the entries are shuffled in place for each epoch
+    dataset_builder.shard(rank_size, rank)
+    shuffle_buffer_size = len(dataset_builder) // p.batch_size
+    # the order of the training samples need not be exact, unlike for dev
+    train_dataset = dataset_builder.as_dataset(
+        p.batch_size, p.num_data_threads, deterministic=False
     )
+    uncached_dataset = train_dataset
+    cache_filled = False
+    cache_dataset = p.cache_dataset or p.snapshot_dir is not None
+    if cache_dataset:
+        # features are deterministic once cmvn is computed, so extract them only
+        # in the first epoch and shuffle the cached batches afterwards
+        cache_file = ""
+        if p.snapshot_dir is not None:
+            # written to disk once, later epochs and runs read the batches back
+            os.makedirs(p.snapshot_dir, exist_ok=True)
+            cache_file = _snapshot_file(p, rank_size, rank)
+            # the batches are read from disk, holding all of them is too much
+            shuffle_buffer_size = p.shuffle_buffer_size
+            # the complete snapshot of an earlier run is read back from the start
+            cache_filled = tf.io.gfile.exists(cache_file + ".index")
+        train_dataset = train_dataset.cache(cache_file)
+    # the dev data never changes, so its features are only extracted once
+    dev_dataset_builder = SUPPORTED_DATASET_BUILDER[p.dataset_builder](p.dataset_config)
+    dev_dataset = dev_dataset_builder.load_csv(p.dev_csv).as_dataset(
+        p.batch_size, p.num_data_threads
+    ).cache()
     while epoch < p.num_epochs:
         if rank == 0:
             logging.info(">>>>> start training in epoch %d" % epoch)
-        dataset_builder.load_csv(p.train_csv).shard(rank_size, rank)
-        if epoch >= p.sorta_epoch:
-            dataset_builder.batch_wise_shuffle(p.batch_size)
-        dataset = dataset_builder.as_dataset(p.batch_size, p.num_data_threads)
+        dataset = train_dataset
+        if epoch < p.sorta_epoch and p.snapshot_dir is not None:
+            # later epochs only shuffle the snapshot within a bounded buffer, so
+            # it stores the batches of a shuffled epoch instead of sorted ones
+            dataset = uncached_dataset
+        elif epoch >= p.sorta_epoch:
+            if cache_filled:
+                # for the in-memory cache, the same as batch_wise_shuffle on the
+                # sorted entries as the shuffle buffer shares the cached tensors
+                dataset = dataset.shuffle(shuffle_buffer_size)
+            else:
+                # shuffling the empty cache would extract the whole epoch before
+                # the first step, so the pass that fills it shuffles the entries
+                dataset_builder.batch_wise_shuffle(p.batch_size)
+        fills_cache = cache_dataset and dataset is train_dataset
+        if cache_dataset:
+            dataset = dataset.prefetch(buffer_size=tf.data.experimental.AUTOTUNE)
         solver.train(dataset)
+        cache_filled = cache_filled or fills_cache
 
         if rank == 0:
             logging.info(">>>>> start evaluate in epoch %d" % epoch)
-        dataset = dataset_builder.load_csv(p.dev_csv).as_dataset(p.batch_size, p.num_data_threads)
-        loss = solver.evaluate(dataset, epoch)
+        loss = solver.evaluate(dev_dataset, epoch)
         epoch = epoch + 1
         if rank == 0:
             checkpointer(loss)
@@ -167,4 +254,4 @@ if __name__ == "__main__":
         CONFIG = json.load(f)
     PARAMS = parse_config(CONFIG)
     BaseSolver.initialize_devices(PARAMS.solver_gpu)
-    train(JSON_FILE, BaseSolver, 1, 0)
+    train(CONFIG, BaseSolver, 1, 0)
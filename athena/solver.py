@@ -37,18 +37,24 @@ class BaseSolver(tf.keras.Model):
         "log_interval": 10,
         "enable_tf_function": True
     }
-    def __init__(self, model, optimizer, sample_signature, config=None, **kwargs):
+    def __init__(self, model, optimizer, sample_signature, config=None,
+                 cmvn_layer=None, **kwargs):
         super().__init__(**kwargs)
         self.model = model
         self.optimizer = optimizer
         self.metric_checker = MetricChecker(self.optimizer)
         self.sample_signature = sample_signature
+        self.cmvn_layer = cmvn_layer
 
         self.hparams = hparam.HParams(cls=self.__class__)
         for keys in self.default_config:
             self.hparams.add_hparam(keys, self.default_config[keys])
         if config is not None:
             self.hparams.override_from_dict(config)
+        if cmvn_layer is not None and self.hparams.enable_tf_function:
+            # traced once per batch shape, so that cmvn runs as one graph on the
+            # device before prepare_samples instead of as a few eager kernels
+            self.cmvn_layer = tf.function(cmvn_layer, experimental_relax_shapes=True)
 
     @staticmethod
     def initialize_devices(visible_gpu_idx=None):
@@ -61,6 +67,25 @@ class BaseSolver(tf.keras.Model):
             for idx in visible_gpu_idx:
                 tf.config.experimental.set_visible_devices(gpus[idx], "GPU")
 
+    @staticmethod
+    def cast_samples(samples):
+        """ cast the features transferred in a narrower dtype (see cmvn_dtype)
+        back to float32, which is done on the device the model runs on
+        """
+        for key, value in samples.items():
+            if value.dtype.is_floating and value.dtype != tf.float32:
+                samples[key] = tf.cast(value, tf.float32)
+        return samples
+
+    def prepare_samples(self, samples):
+        """ cast the samples, apply cmvn on the device if it is not done in the
+        data pipeline and let the model prepare them
+        """
+        samples = self.cast_samples(samples)
+        if self.cmvn_layer is not None:
+            samples["input"] = self.cmvn_layer(samples["input"], samples["input_length"])
+        return self.model.prepare_samples(samples)
+
     @staticmethod
     def clip_by_norm(grads, norm):
         """ clip norm using tf.clip_by_norm """
@@ -90,7 +115,7 @@ class BaseSolver(tf.keras.Model):
             train_step = tf.function(train_step, input_signature=self.sample_signature)
         for batch, samples in enumerate(dataset.take(total_batches)):
             # train 1 step
-            samples = self.model.prepare_samples(samples)
+            samples = self.prepare_samples(samples)
             loss, metrics = train_step(samples)
             if batch % self.hparams.log_interval == 0:
                 logging.info(self.metric_checker(loss, metrics))
@@ -112,7 +137,7 @@ class BaseSolver(tf.keras.Model):
             evaluate_step = tf.function(evaluate_step, input_signature=self.sample_signature)
         self.model.reset_metrics()  # init metric.result() with 0
         for batch, samples in enumerate(dataset):
-            samples = self.model.prepare_samples(samples)
+            samples = self.prepare_samples(samples)
             loss, metrics = evaluate_step(samples)
             if batch % self.hparams.log_interval == 0:
                 logging.info(self.metric_checker(loss, metrics, -2))
@@ -156,7 +181,7 @@ class HorovodSolver(BaseSolver):
             train_step = tf.function(train_step, input_signature=self.sample_signature)
         for batch, samples in enumerate(dataset.take(total_batches)):
             # train 1 step
-            samples = self.model.prepare_samples(samples)
+            samples = self.prepare_samples(samples)
             loss, metrics = train_step(samples)
             # Horovod: broadcast initial variable states from rank 0 to all other processes.
             # This is necessary to ensure consistent initialization of all workers when
@@ -181,7 +206,7 @@ class HorovodSolver(BaseSolver):
             evaluate_step = tf.function(evaluate_step, input_signature=self.sample_signature)
         self.model.reset_metrics()
         for batch, samples in enumerate(dataset):
-            samples = self.model.prepare_samples(samples)
+            samples = self.prepare_samples(samples)
             loss, metrics = evaluate_step(samples)
             if batch % self.hparams.log_interval == 0 and hvd.local_rank() == 0:
                 logging.info(self.metric_checker(loss, metrics, -2))
@@ -204,8 +229,8 @@ class DecoderSolver(BaseSolver):
     }
 
     # pylint: disable=super-init-not-called
-    def __init__(self, model, config=None):
-        super().__init__(model, None, None)
+    def __init__(self, model, config=None, cmvn_layer=None):
+        super().__init__(model, None, None, cmvn_layer=cmvn_layer)
         self.model = model
         self.hparams = hparam.HParams(cls=self.__class__)
         for keys in self.default_config:
@@ -220,7 +245,7 @@ class DecoderSolver(BaseSolver):
         metric = CharactorAccuracy()
         for _, samples in enumerate(dataset):
             begin = time.time()
-            samples = self.model.prepare_samples(samples)
+            samples = self.prepare_samples(samples)
             predictions = self.model.decode(samples, self.hparams)
             validated_preds = validate_seqs(predictions, self.model.eos)[0]
             validated_preds = tf.cast(validated_preds, tf.int64)
@@ -81,6 +81,15 @@ class AudioFeaturizer:
     """
         return self.feat.dim()
 
+    @property
+    def dtype(self):
+        """return the dtype the dataset builders store the feature in once it is
+    normalized, set by cmvn_dtype, the feature itself is always float32
+    """
+        if self.name == "ReadWav":
+            return tf.float32
+        return tf.as_dtype(self.feat.config.get("cmvn_dtype", "float32"))
+
     @property
     def num_channels(self):
         """return the channel of the feature"""
@@ -0,0 +1,55 @@
+# Copyright (C) 2017 Beijing Didi Infinity Technology and Development Co.,Ltd.
+# All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import os
+import numpy as np
+import tensorflow as tf
+from athena.transform.audio_featurizer import AudioFeaturizer
+from athena.data.feature_normalizer import FeatureNormalizer
+
+os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+
+
+class AudioFeaturizerTest(tf.test.TestCase):
+    def test_cmvn_dtype(self):
+        audio = tf.random.uniform([16000], -32768.0, 32768.0)
+        for name in ["Fbank", "Mfcc", "FbankPitch"]:
+            featurizer = AudioFeaturizer({"type": name, "cmvn_dtype": "bfloat16"})
+            self.assertEqual(featurizer.dtype, tf.bfloat16)
+            # the feature is only narrowed by the dataset builders after cmvn
+            self.assertEqual(featurizer(audio, 16000).dtype, tf.float32)
+
+    def test_bfloat16_after_cmvn(self):
+        audio = tf.random.uniform([16000], -32768.0, 32768.0)
+        featurizer = AudioFeaturizer({"type": "Fbank", "cmvn_dtype": "bfloat16"})
+        feat = featurizer(audio, 16000)
+        # statistics of the un-normalized feature, as in cmvn_file
+        frames = np.reshape(feat.numpy(), [-1, featurizer.dim])
+        normalizer = FeatureNormalizer()
+        normalizer.cmvn_dict["global"] = (
+            frames.mean(axis=0).tolist(), frames.var(axis=0).tolist()
+        )
+        expected = normalizer(feat, "global")
+        # the cast done in SpeechRecognitionDatasetBuilder.__getitem__
+        normalized = tf.cast(normalizer(feat, "global"), featurizer.dtype)
+        self.assertEqual(normalized.dtype, tf.bfloat16)
+        self.assertAllClose(
+            expected, tf.cast(normalized, tf.float32), rtol=1e-2, atol=1e-2
+        )
+
+if __name__ == "__main__":
+    if tf.__version__ < "2.0.0":
+        tf.compat.v1.enable_eager_execution()
+    tf.test.main()
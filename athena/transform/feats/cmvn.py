@@ -14,6 +14,9 @@
 # limitations under the License.
 # ==============================================================================
 
+import copy
+import json
+import functools
 import numpy as np
 
 import tensorflow as tf
@@ -22,23 +25,51 @@ from athena.utils.hparam import HParams
 from athena.transform.feats.base_frontend import BaseFrontend
 
 
+@functools.lru_cache(maxsize=64)
+def _params_from_key(cls, config_key):
+    """ build the params of cls from a json dumped config, cached by the config """
+    config = None if config_key is None else json.loads(config_key)
+    return cls.build_params(config)
+
+
 class CMVN(BaseFrontend):
     def __init__(self, config: dict):
         super().__init__(config)
 
-        self.global_cmvn = False
-        if len(config.global_mean) > 1:
-            self.global_cmvn = True
+        # the statistics stay python lists in the hparams, precompute them as
+        # tensors once, so that call never reads the lists and only needs a
+        # multiply-add: (x - mean) / std == x * inv_std - mean * inv_std
+        mean = np.asarray(config.global_mean, dtype=np.float32)
+        inv_std = (1.0 / np.asarray(config.global_variance)).astype(np.float32)
+        self.global_cmvn = mean.shape[0] > 1
+        self._mean = tf.constant(mean)
+        self._inv_std = tf.constant(inv_std)
+        self._mean_times_inv_std = tf.constant(mean * inv_std)
 
     @classmethod
     def params(cls, config=None):
-        """ set params """
+        """ set params, the result is cached for configs that can be dumped as json
+        and a copy is returned, so that the caller can modify it
+        """
+        if config is not None and not isinstance(config, dict):
+            return cls.build_params(config)
+        try:
+            config_key = None if config is None else json.dumps(config, sort_keys=True)
+        except TypeError:
+            return cls.build_params(config)
+        return copy.deepcopy(_params_from_key(cls, config_key))
+
+    @classmethod
+    def build_params(cls, config=None):
+        """ build params without the cache """
 
         hparams = HParams(cls=cls)
         hparams.add_hparam("type", "CMVN")
         hparams.add_hparam("global_mean", [0.0])
         hparams.add_hparam("global_variance", [1.0])
         hparams.add_hparam("local_cmvn", False)
+        # the dtype the dataset builders store the normalized feature in
+        hparams.add_hparam("cmvn_dtype", "float32")
 
         if config is not None:
             hparams.parse(config, True)
@@ -49,34 +80,133 @@ class CMVN(BaseFrontend):
             len(hparams.global_mean), len(hparams.global_variance)
         )
 
-        hparams.global_variance = (np.sqrt(hparams.global_variance) + 1e-6).tolist()
+        # kept as a list, a float list hparam can still be parsed from the configs of
+        # the frontends which append these params
+        hparams.global_variance = (
+            np.sqrt(np.asarray(hparams.global_variance)) + 1e-6
+        ).tolist()
         return hparams
 
+    @tf.function(experimental_relax_shapes=True)
     def call(self, audio_feature, speed=1.0):
         params = self.config
-        if self.global_cmvn:
-            audio_feature = (
-                audio_feature - params.global_mean
-            ) / params.global_variance
+        # the statistics are float32, only cast them when the feature is not,
+        # so that no dtype promotion happens on the feature itself
+        inv_std = self._broadcast_stat(self._inv_std, audio_feature)
 
         if params.local_cmvn:
-            mean, var = tf.compat.v1.nn.moments(audio_feature, axes=0)
-            audio_feature = (audio_feature - mean) / (
-                tf.compat.v1.math.sqrt(var) + 1e-6
+            # global cmvn followed by local cmvn, folded into a single pass:
+            # the global mean cancels out and the local std is scaled by inv_std
+            mean, var = tf.compat.v1.nn.moments(audio_feature, axes=0, keep_dims=True)
+            std = tf.compat.v1.math.sqrt(var)
+            if self.global_cmvn:
+                scale = inv_std * tf.math.reciprocal(std * inv_std + 1e-6)
+            else:
+                scale = tf.math.reciprocal(std + 1e-6)
+            audio_feature = tf.math.multiply(tf.math.subtract(audio_feature, mean), scale)
+        elif self.global_cmvn:
+            mean_times_inv_std = self._broadcast_stat(self._mean_times_inv_std, audio_feature)
+            audio_feature = tf.math.subtract(
+                tf.math.multiply(audio_feature, inv_std), mean_times_inv_std
             )
 
         return audio_feature
 
-        def dim(self):
-            params = self.config
-            return len(params.global_mean)
+    @staticmethod
+    def _broadcast_stat(stat, audio_feature):
+        """ cast a [dim] statistic to the dtype of audio_feature and reshape it to
+        [1, ..., 1, dim], so that the broadcast over the frames is explicit and
+        the op is a single elementwise kernel
+        """
+        stat = tf.cast(stat, audio_feature.dtype)
+        rank = audio_feature.shape.rank
+        if rank is None:
+            return stat
+        return tf.reshape(stat, [1] * (rank - 1) + [-1])
+
+    def dim(self):
+        return int(self._mean.shape[0])
+
+
+def _compute_cmvn_numpy(feat, mean, inv_std, local_cmvn=False):
+    """ vectorized numpy version of the kernel returned by _cmvn_kernel """
+    output = (feat - mean) * inv_std
+    if local_cmvn:
+        output = (output - output.mean(axis=0)) / (output.std(axis=0) + 1e-6)
+    return output.astype(feat.dtype)
+
+
+@functools.lru_cache(maxsize=1)
+def _cmvn_kernel():
+    """ return the numba kernel of compute_cmvn_np, compiled on first use, or
+    the numpy version if numba is not installed
+    """
+    try:
+        import numba
+    except ImportError:
+        return _compute_cmvn_numpy
+
+    @numba.njit(parallel=True, fastmath=True)
+    def kernel(feat, mean, inv_std, local_cmvn=False):
+        num_frames, dim = feat.shape
+        scale = inv_std.copy()
+        offset = mean * inv_std
+        if local_cmvn:
+            for j in numba.prange(dim):
+                local_mean = 0.0
+                m2 = 0.0
+                for i in range(num_frames):
+                    delta = feat[i, j] - local_mean
+                    local_mean += delta / (i + 1)
+                    m2 += delta * (feat[i, j] - local_mean)
+                # moments of the globally normalized feature
+                norm_mean = (local_mean - mean[j]) * inv_std[j]
+                norm_std = np.sqrt(m2 / num_frames) * inv_std[j]
+                local_inv_std = 1.0 / (norm_std + 1e-6)
+                scale[j] = inv_std[j] * local_inv_std
+                offset[j] = (offset[j] + norm_mean) * local_inv_std
+        output = np.empty_like(feat)
+        for i in numba.prange(num_frames):
+            for j in range(dim):
+                output[i, j] = feat[i, j] * scale[j] - offset[j]
+        return output
+
+    return kernel
+
+
+def compute_cmvn_np(feat, mean, inv_std, local_cmvn=False):
+    """ numpy implementation of compute_cmvn for features of shape [frames, dim]
+
+    With numba installed, the local statistics are collected on the raw
+    features with Welford's algorithm and combined with the global ones in
+    closed form, so the normalization is applied in a single pass over the
+    frames.
+    """
+    return _cmvn_kernel()(feat, mean, inv_std, local_cmvn)
 
 
 def compute_cmvn(audio_feature, mean=None, variance=None, local_cmvn=False):
+    if isinstance(audio_feature, np.ndarray):
+        # the computation is done in float32, the result keeps the input dtype
+        shape = audio_feature.shape
+        feat = audio_feature.reshape(shape[0], -1).astype(np.float32)
+        if mean is None:
+            mean = np.zeros(feat.shape[1], dtype=np.float32)
+            inv_std = np.ones(feat.shape[1], dtype=np.float32)
+        else:
+            assert variance is not None
+            mean = np.asarray(mean, dtype=np.float32)
+            inv_std = (1.0 / np.asarray(variance)).astype(np.float32)
+        normalized = compute_cmvn_np(feat, mean, inv_std, local_cmvn)
+        return normalized.reshape(shape).astype(audio_feature.dtype)
     if mean is not None:
         assert variance is not None
-        audio_feature = (audio_feature - mean) / variance
+        mean = tf.cast(mean, audio_feature.dtype)
+        variance = tf.cast(variance, audio_feature.dtype)
+        audio_feature = (audio_feature - mean) * tf.math.reciprocal(variance)
     if local_cmvn:
         mean, var = tf.compat.v1.nn.moments(audio_feature, axes=0)
-        audio_feature = (audio_feature - mean) / (tf.compat.v1.math.sqrt(var) + 1e-6)
+        audio_feature = (audio_feature - mean) * tf.math.reciprocal(
+            tf.compat.v1.math.sqrt(var) + 1e-6
+        )
     return audio_feature
@@ -16,7 +16,7 @@
 
 import numpy as np
 import tensorflow as tf
-from athena.transform.feats.cmvn import CMVN
+from athena.transform.feats.cmvn import CMVN, compute_cmvn, _compute_cmvn_numpy, _cmvn_kernel
 
 
 class CMVNTest(tf.test.TestCase):
@@ -41,6 +41,75 @@ class CMVNTest(tf.test.TestCase):
         normalized = cmvn(audio_feature)
         self.assertAllClose(audio_feature, normalized)
 
+    def test_fused_global_local_cmvn(self):
+        dim = 40
+        mean = np.random.uniform(size=dim).astype(np.float32)
+        variance = np.random.uniform(0.5, 1.5, size=dim).astype(np.float32)
+        cmvn = CMVN.params(
+            {
+                "global_mean": mean.tolist(),
+                "global_variance": variance.tolist(),
+                "local_cmvn": True,
+            }
+        ).instantiate()
+        audio_feature = tf.random.uniform(shape=[100, dim], dtype=tf.float32)
+        expected = compute_cmvn(
+            audio_feature, mean, np.sqrt(variance) + 1e-6, local_cmvn=True
+        )
+        self.assertAllClose(expected, cmvn(audio_feature), rtol=1e-4, atol=1e-4)
+
+    def test_params_cache(self):
+        config = {"global_mean": [1.0, 2.0], "global_variance": [4.0, 9.0]}
+        hparams = CMVN.params(config)
+        hparams.global_mean = [0.0, 0.0]
+        cached = CMVN.params(config)
+        self.assertAllClose([1.0, 2.0], cached.global_mean)
+        self.assertAllClose([2.0, 3.0], cached.global_variance, atol=1e-5)
+
+    def test_dim(self):
+        dim = 40
+        cmvn = CMVN.params(
+            {
+                "global_mean": np.zeros(dim).tolist(),
+                "global_variance": np.ones(dim).tolist(),
+            }
+        ).instantiate()
+        self.assertEqual(dim, cmvn.dim())
+
+    def test_compute_cmvn_np(self):
+        dim = 40
+        mean = np.random.uniform(size=dim).astype(np.float32)
+        variance = np.random.uniform(0.5, 1.5, size=dim).astype(np.float32)
+        audio_feature = np.random.uniform(size=[100, dim])
+        for local_cmvn in [False, True]:
+            expected = compute_cmvn(
+                tf.constant(audio_feature, dtype=tf.float32), mean, variance, local_cmvn
+            )
+            normalized = compute_cmvn(audio_feature, mean, variance, local_cmvn)
+            self.assertEqual(audio_feature.dtype, normalized.dtype)
+            self.assertAllClose(expected, normalized, rtol=1e-4, atol=1e-4)
+            normalized = _compute_cmvn_numpy(
+                audio_feature.astype(np.float32), mean, 1.0 / variance, local_cmvn
+            )
+            self.assertAllClose(expected, normalized, rtol=1e-4, atol=1e-4)
+
+    def test_cmvn_kernel(self):
+        try:
+            import numba  # pylint: disable=import-outside-toplevel, unused-import
+        except ImportError:
+            self.skipTest("numba is not installed")
+        dim = 40
+        mean = np.random.uniform(size=dim).astype(np.float32)
+        variance = np.random.uniform(0.5, 1.5, size=dim).astype(np.float32)
+        audio_feature = np.random.uniform(size=[100, dim]).astype(np.float32)
+        kernel = _cmvn_kernel()
+        self.assertIsNot(kernel, _compute_cmvn_numpy)
+        for local_cmvn in [False, True]:
+            expected = compute_cmvn(
+                tf.constant(audio_feature), mean, variance, local_cmvn
+            )
+            normalized = kernel(audio_feature, mean, 1.0 / variance, local_cmvn)
+            self.assertAllClose(expected, normalized, rtol=1e-4, atol=1e-4)
 
 if __name__ == "__main__":
     if tf.__version__ < "2.0.0":